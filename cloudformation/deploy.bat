@@ -50,6 +50,9 @@ if %ERRORLEVEL% NEQ 0 (
     exit /b 1
 )
 
+REM The optional avro_fast extension (scripts/build_avro_fast.py) must be compiled on
+REM Linux, so Windows deployments use the Lambda's pure-Python Avro reader.
+
 echo ========================================
 echo Deploying SAM Application
 echo ========================================
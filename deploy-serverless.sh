@@ -138,6 +138,9 @@ deploy_up() {
 
     cd "$CLOUDFORMATION_DIR"
     sam build
+    # Optional compiled Avro reader; the Lambda falls back to pure Python without it
+    "$(command -v python3.12 || command -v python3)" ../scripts/build_avro_fast.py .aws-sam/build/MSKToAppSyncFunction \
+        || log_warn "avro_fast extension not built, using the pure-Python Avro reader"
     sam deploy \
         --stack-name "$SAM_STACK_NAME" \
         --capabilities CAPABILITY_NAMED_IAM \
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Compile the optional avro_fast Cython extension into a `sam build` output.
+
+`sam build` packages cloudformation/lambda/ as plain Python; the Lambda falls
+back to its pure-Python Avro reader when the compiled extension is missing, so
+this step is optional. The extension has to match the Lambda runtime, so it is
+only built when this script runs on Linux x86_64 under the function's Python
+version (see Runtime in sam-lambda-appsync.yaml); otherwise it is skipped.
+
+Requirements:
+    pip install cython setuptools
+
+Usage:
+    python build_avro_fast.py ../cloudformation/.aws-sam/build/MSKToAppSyncFunction
+"""
+
+import argparse
+import glob
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+
+LAMBDA_PYTHON = (3, 12)
+SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cloudformation', 'lambda', 'avro_fast.pyx')
+
+
+def build(artifacts_dir: str) -> bool:
+    """Compile avro_fast.pyx and copy the extension into artifacts_dir; returns False if skipped or failed"""
+    if platform.system() != 'Linux' or platform.machine() != 'x86_64' or sys.version_info[:2] != LAMBDA_PYTHON:
+        print(f"⚠️  Skipping avro_fast: needs Linux x86_64 with Python {'.'.join(map(str, LAMBDA_PYTHON))}")
+        return False
+
+    with tempfile.TemporaryDirectory() as build_dir:
+        shutil.copy(SOURCE, build_dir)
+        try:
+            subprocess.run(
+                [sys.executable, '-m', 'Cython.Build.Cythonize', '-i', '-3', 'avro_fast.pyx'],
+                cwd=build_dir, check=True
+            )
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"⚠️  avro_fast build failed, the Lambda will use the pure-Python reader: {e}")
+            return False
+
+        for extension in glob.glob(os.path.join(build_dir, 'avro_fast*.so')):
+            shutil.copy(extension, artifacts_dir)
+            print(f"✅ Added {os.path.basename(extension)} to {artifacts_dir}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile the avro_fast extension into a sam build output')
+    parser.add_argument('artifacts_dir', help='Built function directory, e.g. .aws-sam/build/MSKToAppSyncFunction')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.artifacts_dir):
+        parser.error(f"{args.artifacts_dir} does not exist, run sam build first")
+    build(args.artifacts_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,20 +5,28 @@ Reads messages from a specified topic using the public endpoint.
 
 Requirements:
     pip install kafka-python aws-msk-iam-sasl-signer
+    pip install orjson  # optional, faster JSON pretty-printing
 
 Usage:
     python consume_messages.py --topic taxi-trips
     python consume_messages.py --topic taxi-trips --from-beginning
     python consume_messages.py --topic taxi-trips --max-messages 10
+    python consume_messages.py --topic taxi-trips --flush-every 1
 """
 
 import argparse
 import json
+import sys
 from kafka import KafkaConsumer, KafkaAdminClient
 from kafka.admin import NewTopic
 from kafka.sasl.oauth import AbstractTokenProvider
 from aws_msk_iam_sasl_signer import MSKAuthTokenProvider
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # MSK Public Bootstrap Servers (port 9198 for public IAM access)
 BOOTSTRAP_SERVERS = [
     "b-1-public.taxikafkamsk.upxkpz.c19.kafka.us-east-1.amazonaws.com:9198",
@@ -28,6 +36,25 @@ BOOTSTRAP_SERVERS = [
 REGION = "us-east-1"
 
 
+def format_json(value):
+    """Pretty-print a decoded JSON value, using orjson when available"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_INDENT_2).decode('utf-8')
+        except TypeError:
+            # orjson rejects integers wider than 64 bits, which json.loads accepts
+            pass
+    return json.dumps(value, indent=2)
+
+
+def flush_output(buf):
+    """Write buffered output lines to stdout in a single call"""
+    if buf:
+        sys.stdout.write('\n'.join(buf) + '\n')
+        sys.stdout.flush()
+        buf.clear()
+
+
 class MSKTokenProvider(AbstractTokenProvider):
     """Token provider for MSK IAM authentication"""
     def token(self):
@@ -52,7 +79,7 @@ def list_topics():
     return topics
 
 
-def consume_messages(topic: str, from_beginning: bool = False, max_messages: int = None):
+def consume_messages(topic: str, from_beginning: bool = False, max_messages: int = None, flush_every: int = 100):
     """Consume messages from a Kafka topic"""
     print(f"\n🔌 Connecting to MSK cluster...")
     print(f"📥 Topic: {topic}")
@@ -75,14 +102,17 @@ def consume_messages(topic: str, from_beginning: bool = False, max_messages: int
 
     print(f"✅ Connected! Waiting for messages...\n")
     
+    # Output is buffered and written every `flush_every` messages
+    buf = []
+    out = buf.append
     message_count = 0
     try:
         for message in consumer:
             message_count += 1
-            print(f"📨 Message #{message_count}")
-            print(f"   Partition: {message.partition}")
-            print(f"   Offset: {message.offset}")
-            print(f"   Timestamp: {message.timestamp}")
+            out(f"📨 Message #{message_count}")
+            out(f"   Partition: {message.partition}")
+            out(f"   Offset: {message.offset}")
+            out(f"   Timestamp: {message.timestamp}")
             
             # Try to decode key
             key = message.key
@@ -91,7 +121,7 @@ def consume_messages(topic: str, from_beginning: bool = False, max_messages: int
                     key = key.decode('utf-8')
                 except:
                     key = key.hex()
-            print(f"   Key: {key}")
+            out(f"   Key: {key}")
             
             # Try to decode value - handle UTF-8, JSON, or binary
             value = message.value
@@ -102,23 +132,29 @@ def consume_messages(topic: str, from_beginning: bool = False, max_messages: int
                     # Try to parse as JSON
                     try:
                         value = json.loads(decoded)
-                        print(f"   Value: {json.dumps(value, indent=6)}")
+                        out(f"   Value: {format_json(value)}")
                     except json.JSONDecodeError:
-                        print(f"   Value: {decoded}")
+                        out(f"   Value: {decoded}")
                 except UnicodeDecodeError:
                     # Binary data - show as hex with preview
-                    print(f"   Value (binary, {len(value)} bytes): {value[:100].hex()}...")
+                    out(f"   Value (binary, {len(value)} bytes): {value[:100].hex()}...")
             else:
-                print(f"   Value: None")
-            print()
+                out(f"   Value: None")
+            out("")
+
+            if message_count % flush_every == 0:
+                flush_output(buf)
 
             if max_messages and message_count >= max_messages:
+                flush_output(buf)
                 print(f"✋ Reached max messages limit ({max_messages})")
                 break
 
     except KeyboardInterrupt:
+        flush_output(buf)
         print("\n⏹️ Stopped by user")
     finally:
+        flush_output(buf)
         consumer.close()
         print(f"\n📊 Total messages consumed: {message_count}")
 
@@ -129,13 +165,14 @@ def main():
     parser.add_argument('--from-beginning', '-b', action='store_true', help='Read from beginning of topic')
     parser.add_argument('--max-messages', '-m', type=int, help='Maximum number of messages to consume')
     parser.add_argument('--list-topics', '-l', action='store_true', help='List all available topics')
+    parser.add_argument('--flush-every', '-f', type=int, default=100, help='Write output every N messages (default: 100)')
     
     args = parser.parse_args()
 
     if args.list_topics:
         list_topics()
     else:
-        consume_messages(args.topic, args.from_beginning, args.max_messages)
+        consume_messages(args.topic, args.from_beginning, args.max_messages, max(1, args.flush_every))
 
 
 if __name__ == "__main__":
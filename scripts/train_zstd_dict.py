@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Train a zstd dictionary for compressing the stored event `data` attribute.
+
+The Lambda compresses each record's data with this dictionary only when it is
+bundled in cloudformation/lambda/ and the stack's DataZstdDictPath parameter
+(DATA_ZSTD_DICT_PATH) names it. Samples are read from a JSON Lines file with one
+decoded trip message per line, i.e. the record values as produced to Kafka, and
+re-encoded with msgspec exactly as the Lambda encodes them before compressing.
+
+Requirements:
+    pip install zstandard msgspec
+
+Usage:
+    python train_zstd_dict.py --samples taxi-trips.jsonl
+    python train_zstd_dict.py --samples taxi-trips.jsonl --size 16384 --output ../cloudformation/lambda/taxi.dict
+    sam deploy ... --parameter-overrides DataZstdDictPath=taxi.dict
+"""
+
+import argparse
+import msgspec
+import zstandard
+
+
+def load_samples(path: str):
+    """Load samples and re-encode them with msgspec, matching the bytes the Lambda compresses"""
+    decoder = msgspec.json.Decoder()
+    encoder = msgspec.json.Encoder()
+    samples = []
+    with open(path, 'rb') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                samples.append(encoder.encode(decoder.decode(line)))
+    return samples
+
+
+def train_dictionary(samples, size: int, output: str):
+    """Train the dictionary, write it to disk and report the compression ratio"""
+    print(f"📚 Training {size}-byte dictionary on {len(samples)} samples...")
+    dictionary = zstandard.train_dictionary(size, samples)
+    with open(output, 'wb') as f:
+        f.write(dictionary.as_bytes())
+
+    compressor = zstandard.ZstdCompressor(level=3, dict_data=dictionary)
+    raw_size = sum(len(s) for s in samples)
+    compressed_size = sum(len(compressor.compress(s)) for s in samples)
+    print(f"✅ Wrote {output} (dict id {dictionary.dict_id()})")
+    print(f"📊 {raw_size} -> {compressed_size} bytes ({100 * (1 - compressed_size / raw_size):.1f}% smaller)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train a zstd dictionary for stored taxi event data')
+    parser.add_argument('--samples', '-s', required=True, help='JSON Lines file with one message per line')
+    parser.add_argument('--size', type=int, default=16384, help='Dictionary size in bytes (default: 16384)')
+    parser.add_argument('--output', '-o', default='taxi.dict', help='Output dictionary file (default: taxi.dict)')
+
+    args = parser.parse_args()
+
+    train_dictionary(load_samples(args.samples), args.size, args.output)
+
+
+if __name__ == "__main__":
+    main()
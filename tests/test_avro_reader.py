@@ -0,0 +1,133 @@
+"""
+Generated/compiled Avro readers must decode exactly what fastavro decodes and
+reject every input fastavro rejects, so undecodable payloads stay raw bytes.
+"""
+import io
+import os
+import random
+import sys
+
+import pytest
+
+fastavro = pytest.importorskip("fastavro")
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "cloudformation", "lambda"))
+
+import index  # noqa: E402
+
+SCHEMA = fastavro.parse_schema({
+    "type": "record",
+    "name": "TaxiTrip",
+    "namespace": "com.taxi.test",
+    "fields": [
+        {"name": "VendorID", "type": ["null", "long"]},
+        {"name": "tpep_pickup_datetime", "type": ["string", "null"]},
+        {"name": "passenger_count", "type": "int"},
+        {"name": "trip_distance", "type": "double"},
+        {"name": "PULocationID", "type": ["null", "int"]},
+        {"name": "fare", "type": "float"},
+        {"name": "flag", "type": "boolean"},
+        {"name": "raw", "type": "bytes"},
+        {"name": "nothing", "type": "null"},
+        {"name": "status", "type": {"type": "enum", "name": "Status", "symbols": ["A", "B", "C"]}},
+        {"name": "big", "type": "long"},
+        {"name": "note", "type": "string"},
+    ],
+})
+
+
+def _encode(record, schema=SCHEMA):
+    buf = io.BytesIO()
+    fastavro.schemaless_writer(buf, schema, record)
+    return buf.getvalue()
+
+
+def _random_record(rng):
+    return {
+        "VendorID": rng.choice([None, 1, -300, 2 ** 40]),
+        "tpep_pickup_datetime": rng.choice([None, "2024-01-01 10:00:00", "ü"]),
+        "passenger_count": rng.randint(-100, 100),
+        "trip_distance": rng.random() * 100,
+        "PULocationID": rng.choice([None, 5, 263]),
+        "fare": 1.5,
+        "flag": rng.random() < 0.5,
+        "raw": bytes(rng.randrange(256) for _ in range(rng.randrange(4))),
+        "nothing": None,
+        "status": rng.choice("ABC"),
+        "big": rng.randint(-2 ** 62, 2 ** 62),
+        "note": "hello world",
+    }
+
+
+@pytest.fixture(params=["python", "native"])
+def compile_reader(request, monkeypatch):
+    if request.param == "native":
+        if not index.AVRO_FAST_AVAILABLE:
+            pytest.skip("avro_fast extension not built")
+    else:
+        monkeypatch.setattr(index, "AVRO_FAST_AVAILABLE", False)
+
+    def compile_reader(schema):
+        compiled = index.compile_avro_reader(schema)
+        assert compiled is not None
+        return compiled
+
+    return compile_reader
+
+
+@pytest.fixture
+def reader(compile_reader):
+    return compile_reader(SCHEMA)
+
+
+def _rejects(reader, payload):
+    try:
+        reader(payload)
+    except Exception:
+        return True
+    return False
+
+
+def test_matches_fastavro(reader):
+    rng = random.Random(1234)
+    for _ in range(2000):
+        raw = _encode(_random_record(rng))
+        expected = fastavro.schemaless_reader(io.BytesIO(raw), SCHEMA)
+        assert reader(raw) == expected
+        assert reader(memoryview(raw)) == expected
+
+
+def test_rejects_every_truncation(reader):
+    raw = _encode(_random_record(random.Random(99)))
+    for cut in range(len(raw)):
+        assert _rejects(reader, raw[:cut]), cut
+
+
+def test_rejects_out_of_range_enum_index(compile_reader):
+    reader = compile_reader(fastavro.parse_schema({
+        "type": "record",
+        "name": "E",
+        "fields": [{"name": "e", "type": {"type": "enum", "name": "S", "symbols": ["A", "B"]}}],
+    }))
+    assert reader(b"\x02") == {"e": "B"}
+    # Indexes 5, -1 and -64
+    for payload in (b"\x0a", b"\x01", b"\x7f"):
+        assert _rejects(reader, payload), payload
+
+
+def test_rejects_invalid_union_branch(reader):
+    raw = bytearray(_encode(_random_record(random.Random(7))))
+    # First field is ["null", "long"]; branch 2 does not exist
+    raw[0] = 0x04
+    assert _rejects(reader, bytes(raw))
+
+
+def test_decode_avro_payload_keeps_raw_bytes_on_failure():
+    result = index.decode_avro_payload(b"\x0a", fastavro.parse_schema({
+        "type": "record",
+        "name": "E2",
+        "fields": [{"name": "e", "type": {"type": "enum", "name": "S2", "symbols": ["A"]}}],
+    }))
+    assert result["raw_bytes"] == b"\x0a"
+    assert "decode_error" in result
@@ -0,0 +1,164 @@
+"""
+Batch DynamoDB writes must never silently drop events: unprocessed items are
+retried until the deadline, bad items are skipped individually, and service
+failures fail the invocation so MSK redelivers the batch.
+"""
+import base64
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import date, time as time_of_day
+from decimal import Decimal
+
+import pytest
+
+boto3 = pytest.importorskip("boto3")
+from boto3.dynamodb.types import TypeSerializer  # noqa: E402
+from botocore.exceptions import ClientError  # noqa: E402
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "cloudformation", "lambda"))
+
+import index  # noqa: E402
+
+_serialize = TypeSerializer().serialize
+
+
+def _client_error(code, operation):
+    return ClientError({'Error': {'Code': code, 'Message': 'boom'}}, operation)
+
+
+class FakeClient:
+    """
+    BatchWriteItem stand-in that serializes items the way boto3 does and rejects
+    the whole batch with a ValidationException if it contains a rejected item.
+    """
+
+    def __init__(self, table, unprocessed_rounds=0, error_code=None):
+        self.table = table
+        self.unprocessed_rounds = unprocessed_rounds
+        self.error_code = error_code
+        self.calls = []
+
+    def batch_write_item(self, RequestItems):
+        requests = RequestItems[self.table.name]
+        for request in requests:
+            _serialize(request['PutRequest']['Item'])
+        self.calls.append(len(requests))
+        if self.error_code:
+            raise _client_error(self.error_code, 'BatchWriteItem')
+        if any(request['PutRequest']['Item']['id'] in self.table.reject_ids for request in requests):
+            raise _client_error('ValidationException', 'BatchWriteItem')
+        if self.unprocessed_rounds:
+            self.unprocessed_rounds -= 1
+            requests, unprocessed = requests[1:], requests[:1]
+        else:
+            unprocessed = []
+        self.table.saved.extend(request['PutRequest']['Item']['id'] for request in requests)
+        return {'UnprocessedItems': {self.table.name: unprocessed} if unprocessed else {}}
+
+
+class FakeMeta:
+    def __init__(self, client):
+        self.client = client
+
+
+class FakeTable:
+    name = 'events'
+
+    def __init__(self, reject_ids=(), **client_kwargs):
+        self.saved = []
+        self.reject_ids = set(reject_ids)
+        self.meta = FakeMeta(FakeClient(self, **client_kwargs))
+
+    def put_item(self, Item):
+        _serialize(Item)
+        if Item['id'] in self.reject_ids:
+            raise _client_error('ValidationException', 'PutItem')
+        self.saved.append(Item['id'])
+
+
+def _payloads(count):
+    return [{
+        'topic': 'taxi-trips',
+        'partition': 0,
+        'offset': offset,
+        'data': {'PULocationID': 5, 'fare_amount': 12.5},
+    } for offset in range(count)]
+
+
+@pytest.fixture
+def table(monkeypatch):
+    def install(**client_kwargs):
+        fake = FakeTable(**client_kwargs)
+        monkeypatch.setattr(index, 'events_table', fake)
+        monkeypatch.setattr(index, '_zstd_compressor', None)
+        return fake
+    return install
+
+
+def test_unprocessed_items_are_retried(table):
+    fake = table(unprocessed_rounds=2)
+    saved_ids = index.batch_save_to_dynamodb(_payloads(3))
+    assert sorted(saved_ids) == sorted(fake.saved) == [f"taxi-trips-0-{i}" for i in range(3)]
+    assert fake.meta.client.calls == [3, 1, 1]
+
+
+def test_unprocessed_items_raise_at_deadline(table):
+    table(unprocessed_rounds=1000)
+    with pytest.raises(RuntimeError):
+        index.batch_save_to_dynamodb(_payloads(3), deadline=time.monotonic() + 0.2)
+
+
+def test_bad_item_skips_only_that_item(table):
+    fake = table(reject_ids={"taxi-trips-0-7"})
+    saved_ids = index.batch_save_to_dynamodb(_payloads(25))
+    assert len(saved_ids) == 24
+    assert "taxi-trips-0-7" not in fake.saved
+
+
+def test_unserializable_item_falls_back_to_single_puts(table):
+    fake = table()
+    payloads = _payloads(3)
+    payloads[1]['data']['tags'] = object()
+    saved_ids = index.batch_save_to_dynamodb(payloads)
+    assert sorted(saved_ids) == sorted(fake.saved) == ["taxi-trips-0-0", "taxi-trips-0-2"]
+
+
+def test_service_error_is_raised(table):
+    table(error_code='ResourceNotFoundException')
+    with pytest.raises(ClientError):
+        index.batch_save_to_dynamodb(_payloads(3))
+
+
+def test_handler_counts_unsaved_events_as_errors(table):
+    table(reject_ids={"taxi-trips-0-7"})
+    records = [{
+        'partition': 0,
+        'offset': payload['offset'],
+        'value': base64.b64encode(json.dumps(payload['data']).encode()).decode(),
+    } for payload in _payloads(25)]
+    result = index.lambda_handler({'records': {'taxi-trips-0': records}}, None)
+    assert result['body']['saved'] == 24
+    assert result['body']['errors'] == 1
+
+
+def test_to_dynamodb_map_converts_logical_types_and_out_of_range_numbers():
+    trip_id = uuid.uuid4()
+    converted = index._to_dynamodb_map({
+        'name': 'x', 'count': 3, 'flag': True, 'raw': b'\x00', 'none': None,
+        'fare': 12.5, 'nan': float('nan'), 'huge': 1e200, 'tiny': 5e-324, 'zero': 0.0,
+        'wide_int': 2 ** 200, 'price': Decimal('1.50'), 'wide_decimal': Decimal('1' * 40),
+        'id': trip_id, 'day': date(2024, 1, 2), 'at': time_of_day(10, 30, 0, 500),
+        'nested': {'values': [1.5, trip_id]},
+    })
+    assert converted == {
+        'name': 'x', 'count': 3, 'flag': True, 'raw': b'\x00', 'none': None,
+        'fare': Decimal('12.5'), 'nan': None, 'huge': '1E+200', 'tiny': '5E-324', 'zero': Decimal('0.0'),
+        'wide_int': str(2 ** 200), 'price': Decimal('1.50'), 'wide_decimal': '1' * 40,
+        'id': str(trip_id), 'day': '2024-01-02', 'at': '10:30:00.000500',
+        'nested': {'values': [Decimal('1.5'), str(trip_id)]},
+    }
+    _serialize(converted)